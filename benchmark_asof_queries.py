@@ -0,0 +1,91 @@
+"""
+As-of query benchmark for project_starter.py: the reporting-dashboard pattern of
+asking the same questions for every day of a year.
+
+Seeds a fresh database in a temporary directory, replays quote_requests_sample.csv
+through the deterministic orchestrator (`OrchestratorCore`, no LLM), then times, per
+date, in these configurations:
+
+- sqlite:   the helpers on the SQLite store (running ledger tables, grouped SQL)
+- columnar: the same helpers on an `ArrayStore` snapshot of that database, answered
+            from its `ColumnarLedger` prefix sums (snapshot load included for reports,
+            via `generate_financial_reports`)
+
+Queries: `get_stock_level` + `get_all_inventory` + `get_cash_balance`, and
+`generate_financial_report`.
+
+Usage:
+    python benchmark_asof_queries.py [runs]
+"""
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import project_starter
+from benchmark_db_throughput import load_requests
+
+DATES = [day.isoformat() for day in pd.date_range("2025-01-01", "2025-12-31")]
+
+
+def time_helpers() -> float:
+    """Run the as-of helpers for every date on the active store; return elapsed seconds"""
+    start = time.perf_counter()
+    for as_of_date in DATES:
+        project_starter.get_stock_level("A4 paper", as_of_date)
+        project_starter.get_all_inventory(as_of_date)
+        project_starter.get_cash_balance(as_of_date)
+    return time.perf_counter() - start
+
+
+def time_reports(batched: bool) -> float:
+    """Generate a financial report for every date, one by one or batched; return elapsed seconds"""
+    start = time.perf_counter()
+    if batched:
+        project_starter.generate_financial_reports(DATES)
+    else:
+        for as_of_date in DATES:
+            project_starter.generate_financial_report(as_of_date)
+    return time.perf_counter() - start
+
+
+def main(runs: int = 5):
+    original_engine = project_starter.db_engine
+    timings = {"helpers": {"sqlite": [], "columnar": []}, "report": {"sqlite": [], "columnar": []}}
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = project_starter.create_storage_engine("file", f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            project_starter.db_engine = engine
+            with contextlib.redirect_stdout(io.StringIO()):
+                project_starter.init_database(engine)
+                orchestrator = project_starter.OrchestratorCore()
+                for request in load_requests():
+                    orchestrator.process_quote_request(request)
+
+            snapshot = project_starter.ArrayStore.from_engine(engine)
+            for _ in range(runs):
+                timings["helpers"]["sqlite"].append(time_helpers())
+                timings["report"]["sqlite"].append(time_reports(batched=False))
+                timings["report"]["columnar"].append(time_reports(batched=True))
+                with project_starter.use_store(snapshot):
+                    timings["helpers"]["columnar"].append(time_helpers())
+            project_starter.close_storage(engine)
+    finally:
+        project_starter.db_engine = original_engine
+
+    print(f"As-of query benchmark ({len(DATES)} dates, {runs} runs each)")
+    print(f"{'query':<9} {'store':<9} {'median':>9} {'per date':>10}")
+    for query, stores in timings.items():
+        for store, values in stores.items():
+            median = statistics.median(values)
+            print(f"{query:<9} {store:<9} {median:>8.3f}s {median / len(DATES) * 1e6:>8.0f}us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
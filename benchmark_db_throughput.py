@@ -0,0 +1,99 @@
+"""
+Request-throughput benchmark for the database connection layer in project_starter.py.
+
+Replays quote_requests_sample.csv through the deterministic orchestrator
+(`OrchestratorCore`, no LLM) plus a financial report per request, against a fresh
+database in a temporary directory, in these configurations:
+
+- default engine:  plain `create_engine()` (rollback journal, default PRAGMAs),
+                   every helper checks out its own connection
+- pooled session:  `create_db_engine()` (WAL, tuned PRAGMAs, sized pool) with each
+                   request wrapped in `db_session()` so helpers share one connection
+- deferred storage: the pooled session on `create_storage_engine("deferred")`
+                   (same file, no fsyncs)
+- memory storage:  the pooled session on `create_storage_engine("memory")`
+                   (shared-cache in-memory database)
+
+Usage:
+    python benchmark_db_throughput.py [runs]
+"""
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+import project_starter
+
+
+def load_requests() -> list:
+    """Sample requests in processing order, shaped like run_test_scenarios builds them"""
+    df = pd.read_csv("quote_requests_sample.csv")
+    df["request_date"] = pd.to_datetime(df["request_date"], format="%m/%d/%y", errors="coerce")
+    df = df.dropna(subset=["request_date"]).sort_values("request_date")
+    df["request_date"] = df["request_date"].dt.strftime("%Y-%m-%d")
+    return [
+        {
+            "job": str(row.job),
+            "need_size": str(row.need_size),
+            "event": str(row.event),
+            "request_text": str(row.request),
+            "request_date": row.request_date,
+            "mood": "neutral",
+        }
+        for row in df.itertuples()
+    ]
+
+
+def replay(engine, requests: list, use_session: bool) -> float:
+    """Seed a database on `engine`, replay the requests and return elapsed seconds"""
+    project_starter.db_engine = engine
+    with contextlib.redirect_stdout(io.StringIO()):
+        project_starter.init_database(engine)
+        orchestrator = project_starter.OrchestratorCore()
+
+        start = time.perf_counter()
+        for request in requests:
+            session = project_starter.db_session() if use_session else contextlib.nullcontext()
+            with session:
+                orchestrator.process_quote_request(request)
+                project_starter.generate_financial_report(request["request_date"])
+        elapsed = time.perf_counter() - start
+
+    project_starter.close_storage(engine)
+    return elapsed
+
+
+def main(runs: int = 5):
+    requests = load_requests()
+    original_engine = project_starter.db_engine
+
+    configurations = [
+        ("default engine", lambda url: create_engine(url), False),
+        ("pooled session", lambda url: project_starter.create_db_engine(url), True),
+        ("deferred storage", lambda url: project_starter.create_storage_engine("deferred", url), True),
+        ("memory storage", lambda url: project_starter.create_storage_engine("memory", url), True),
+    ]
+
+    print(f"DB throughput benchmark ({len(requests)} requests, {runs} runs each)")
+    print(f"{'scenario':<18} {'median':>9} {'req/s':>9}")
+    try:
+        for label, make_engine, use_session in configurations:
+            timings = []
+            for _ in range(runs):
+                with tempfile.TemporaryDirectory() as tmp:
+                    url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+                    timings.append(replay(make_engine(url), requests, use_session))
+            median = statistics.median(timings)
+            print(f"{label:<18} {median:>8.3f}s {len(requests) / median:>9.1f}")
+    finally:
+        project_starter.db_engine = original_engine
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
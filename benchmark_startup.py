@@ -0,0 +1,47 @@
+"""
+Startup-time benchmark for project_starter.py.
+
+Each measurement runs in a fresh Python process so module caches don't carry over:
+
+- core import:   `import project_starter` (deterministic helpers, no LLM layer)
+- agent layer:   `import project_starter` followed by `load_agent_framework()`,
+                 i.e. what every import used to cost before the LLM layer was deferred
+
+Usage:
+    python benchmark_startup.py [runs]
+"""
+import statistics
+import subprocess
+import sys
+
+CORE_IMPORT = "import project_starter"
+AGENT_LAYER = "import project_starter; project_starter.load_agent_framework()"
+
+
+def time_statement(statement: str) -> float:
+    """Run a statement in a new interpreter and return its wall time in seconds"""
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main(runs: int = 5):
+    print(f"Startup benchmark ({runs} runs each, fresh interpreter per run)")
+    print(f"{'scenario':<14} {'median':>9} {'min':>9} {'max':>9}")
+    for label, statement in [("core import", CORE_IMPORT), ("agent layer", AGENT_LAYER)]:
+        timings = [time_statement(statement) for _ in range(runs)]
+        print(
+            f"{label:<14} {statistics.median(timings):>8.3f}s "
+            f"{min(timings):>8.3f}s {max(timings):>8.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
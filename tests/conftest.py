@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# project_starter.py is a top-level module of the repository
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
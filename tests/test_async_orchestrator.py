@@ -0,0 +1,62 @@
+"""
+`process_quote_request_async` against `process_quote_request`.
+"""
+import asyncio
+import contextlib
+import io
+import threading
+
+import project_starter as ps
+
+REQUEST = {
+    "job": "office manager",
+    "need_size": "small",
+    "event": "meeting",
+    "request_text": "I need 200 sheets of A4 paper",
+    "request_date": "2025-04-01",
+    "mood": "neutral",
+}
+
+
+def seeded_store(path):
+    engine = ps.create_storage_engine("file", f"sqlite:///{path}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        ps.init_database(engine)
+    return ps.SQLiteStore(engine)
+
+
+def test_async_request_matches_sync_and_keeps_blocking_work_off_the_loop(tmp_path, monkeypatch):
+    sync_store = seeded_store(tmp_path / "sync.db")
+    async_store = seeded_store(tmp_path / "async.db")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = ps.OrchestratorCore(store=sync_store).process_quote_request(REQUEST)
+
+            orchestrator = ps.OrchestratorCore(store=async_store)
+            ps.invalidate_catalog(async_store)
+            cold_catalog_reads = []
+            quote_threads = []
+            get_catalog = ps.get_catalog
+            create_full_quote = orchestrator.quote_agent.create_full_quote
+
+            def recording_get_catalog():
+                if not ps.catalog_is_cached():
+                    cold_catalog_reads.append(threading.current_thread())
+                return get_catalog()
+
+            def recording_create_full_quote(*args, **kwargs):
+                quote_threads.append(threading.current_thread())
+                return create_full_quote(*args, **kwargs)
+
+            monkeypatch.setattr(ps, "get_catalog", recording_get_catalog)
+            monkeypatch.setattr(orchestrator.quote_agent, "create_full_quote", recording_create_full_quote)
+
+            loop_thread = threading.current_thread()
+            response = asyncio.run(orchestrator.process_quote_request_async(REQUEST))
+
+        assert response == expected
+        assert cold_catalog_reads and loop_thread not in cold_catalog_reads
+        assert quote_threads and loop_thread not in quote_threads
+    finally:
+        ps.close_storage(sync_store.engine)
+        ps.close_storage(async_store.engine)
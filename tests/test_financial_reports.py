@@ -0,0 +1,66 @@
+"""
+Batched financial reports against one report per date.
+"""
+import contextlib
+import io
+import math
+from datetime import datetime
+
+import project_starter as ps
+
+REQUESTS = [
+    ("I need 200 sheets of A4 paper", "2025-04-01"),
+    ("I need 100 sheets of cardstock", "2025-04-01"),
+    ("I need 500 sheets of A4 paper", "2025-04-03"),
+]
+
+# Seed transactions are stored as '2025-01-01T00:00:00', which the SQL helpers'
+# string comparison puts after the bare date '2025-01-01'
+DATES = [
+    "2024-12-31",
+    "2025-01-01",
+    "2025-01-01T00:00:00",
+    datetime(2025, 1, 1),
+    "2025-04-01",
+    "2025-04-02T12:00:00",
+    "2025-04-03",
+    "2025-12-31",
+]
+
+
+def comparable(value):
+    """A report with NaN (the seed cash row's units) replaced by None, so reports compare equal"""
+    if isinstance(value, dict):
+        return {key: comparable(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [comparable(item) for item in value]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def test_batched_reports_match_single_reports(tmp_path):
+    engine = ps.create_storage_engine("file", f"sqlite:///{tmp_path / 'reports.db'}")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            ps.init_database(engine)
+            with ps.use_store(ps.SQLiteStore(engine)):
+                orchestrator = ps.OrchestratorCore()
+                for text, date in REQUESTS:
+                    orchestrator.process_quote_request({
+                        "job": "office manager",
+                        "need_size": "small",
+                        "event": "meeting",
+                        "request_text": text,
+                        "request_date": date,
+                        "mood": "neutral",
+                    })
+
+                single = [ps.generate_financial_report(date) for date in DATES]
+                batched = ps.generate_financial_reports(DATES)
+
+        assert single[1]["cash_balance"] == 0.0
+        assert single[2]["cash_balance"] > 0.0
+        assert comparable(batched) == comparable(single)
+    finally:
+        ps.close_storage(engine)
@@ -0,0 +1,41 @@
+"""
+The LLM response cache in front of the orchestrator's model.
+"""
+import copy
+import types
+
+import pytest
+
+import project_starter as ps
+
+MESSAGES = [{"role": "user", "content": "I need 200 sheets of A4 paper"}]
+
+
+@pytest.fixture
+def cached(tmp_path):
+    cache = ps.LLMResponseCache(str(tmp_path / "llm_cache.db"))
+    model = ps.LocalStandInModel()
+    yield ps.CachedModel(model, cache, "tools"), model
+    ps.close_storage(cache.engine)
+
+
+def test_generate_arguments_are_part_of_the_key(cached):
+    cached_model, model = cached
+    tool = types.SimpleNamespace(name="final_answer", description="", inputs={}, output_type="any")
+
+    cached_model.generate(MESSAGES)
+    cached_model.generate(MESSAGES, grammar=None)
+    assert model.calls == 1
+
+    cached_model.generate(MESSAGES, tools_to_call_from=[tool])
+    cached_model.generate(MESSAGES, tools_to_call_from=[tool])
+    cached_model.generate(MESSAGES, response_format={"type": "json_object"})
+    assert model.calls == 3
+
+
+def test_wrapper_without_a_model_raises_attribute_error(cached):
+    cached_model, model = cached
+    assert copy.copy(cached_model).model is model
+
+    with pytest.raises(AttributeError):
+        ps.CachedModel.__new__(ps.CachedModel).model_id
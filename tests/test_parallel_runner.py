@@ -0,0 +1,75 @@
+"""
+The parallel batch runner against a sequential run of the same requests.
+"""
+import contextlib
+import io
+
+import project_starter as ps
+
+
+def request(text, date):
+    return {
+        "job": "office manager",
+        "need_size": "small",
+        "event": "meeting",
+        "request_text": text,
+        "request_date": date,
+        "mood": "neutral",
+    }
+
+
+# The LLM-routed request names no item (its partition key falls back to A4 paper) but
+# its tools sell off the cardstock the requests around it ask for
+REQUESTS = [
+    request("I need 200 sheets of A4 paper", "2025-04-01"),
+    request("I need 100 sheets of cardstock", "2025-04-02"),
+    request("Please sort out whatever the team needs, surprise us", "2025-04-03"),
+    request("I need 100 sheets of cardstock", "2025-04-04"),
+    request("I need 300 sheets of A4 paper", "2025-04-05"),
+]
+
+
+class SurpriseOrchestrator(ps.OrchestratorCore):
+    """Routes 'surprise' requests to an LLM stand-in that sells all cardstock in stock"""
+
+    def route_request(self, request, multi_item=False):
+        decision = super().route_request(request, multi_item)
+        if "surprise" in request["request_text"]:
+            decision["route"] = "llm"
+        return decision
+
+    def process_with_llm(self, request, decision):
+        level = ps.get_stock_level("Cardstock", request["request_date"])["current_stock"].iloc[0]
+        ps.tool_record_sale("Cardstock", int(level), float(level) * 0.15, request["request_date"])
+        return {"status": "processed", "item": "Cardstock", "quantity": int(level)}
+
+
+def replay(path, parallel):
+    engine = ps.create_storage_engine("file", f"sqlite:///{path}")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            ps.init_database(engine)
+            with ps.use_store(ps.SQLiteStore(engine)):
+                orchestrator = SurpriseOrchestrator()
+                if parallel:
+                    responses = [
+                        response for response, _, _ in ps.process_requests_in_parallel(orchestrator, REQUESTS, workers=1)
+                    ]
+                else:
+                    responses = [orchestrator.process_quote_request(r) for r in REQUESTS]
+                ledger = ps.pd.read_sql(
+                    "SELECT item_name, transaction_type, units, price, transaction_date FROM transactions ORDER BY id",
+                    engine,
+                )
+        return responses, ledger
+    finally:
+        ps.close_storage(engine)
+
+
+def test_llm_routed_requests_keep_their_place_in_the_batch(tmp_path):
+    sequential_responses, sequential_ledger = replay(tmp_path / "sequential.db", parallel=False)
+    parallel_responses, parallel_ledger = replay(tmp_path / "parallel.db", parallel=True)
+
+    assert [r["routing"]["route"] for r in parallel_responses][2] == "llm"
+    assert parallel_responses == sequential_responses
+    assert parallel_ledger.equals(sequential_ledger)
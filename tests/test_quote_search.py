@@ -0,0 +1,28 @@
+"""
+The full-text quote history index.
+"""
+import contextlib
+import io
+
+import pytest
+
+import project_starter as ps
+
+
+@pytest.mark.parametrize("seed", [ps.init_database, ps.reset_database])
+def test_seeded_database_searches_without_building_the_index(tmp_path, monkeypatch, seed):
+    monkeypatch.setattr(ps, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    engine = ps.create_storage_engine("file", f"sqlite:///{tmp_path / 'quotes.db'}")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed(engine)
+            seed(engine)
+
+        def build_on_search(db_engine):
+            raise AssertionError("quote_search was built by a search")
+
+        monkeypatch.setattr(ps, "rebuild_quote_search_index", build_on_search)
+        with ps.use_store(ps.SQLiteStore(engine)):
+            assert ps.search_quote_history(["paper"], limit=5)
+    finally:
+        ps.close_storage(engine)
@@ -0,0 +1,120 @@
+"""
+Resuming an interrupted `run_test_scenarios` replay from its checkpoint.
+"""
+import contextlib
+import io
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import project_starter as ps
+
+REQUESTS_PATH = str(Path(__file__).resolve().parent.parent / "quote_requests_sample.csv")
+FLUSH_EVERY = 4
+CRASH_AT = 10
+
+
+class Interrupted(BaseException):
+    """Stands in for the process being killed: not caught by the per-request handling"""
+
+
+class CrashingOrchestrator(ps.OrchestratorCore):
+    """Writes part of request `crash_at` and dies; every other request is handled normally"""
+
+    def __init__(self, crash_at=None):
+        super().__init__()
+        self.crash_at = crash_at
+        self.calls = 0
+
+    def process_quote_request(self, request, multi_item=False, prepared=None):
+        self.calls += 1
+        if self.calls == self.crash_at:
+            ps.create_transaction("A4 paper", "sales", 10, 1.0, request["request_date"])
+            raise Interrupted()
+        return super().process_quote_request(request, multi_item, prepared)
+
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    """
+    Run `run_test_scenarios` on a database of its own; returns the results file's bytes
+    and the database's ledger, and keeps the return value and stdout on `run`.
+    """
+    engines = {}
+
+    def run(name, orchestrator=None, resume=False, **options):
+        if name not in engines:
+            engines[name] = ps.create_storage_engine("file", f"sqlite:///{tmp_path / (name + '.db')}")
+        engine = engines[name]
+        results_path = str(tmp_path / f"{name}.csv")
+        monkeypatch.setattr(ps, "db_engine", engine)
+        monkeypatch.setattr(
+            ps, "initialize_multi_agent_system",
+            lambda *args, store=None, **kwargs: orchestrator or ps.OrchestratorCore(),
+        )
+        out = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(out):
+                run.returned = ps.run_test_scenarios(
+                    requests_path=REQUESTS_PATH, results_path=results_path, flush_every=FLUSH_EVERY, resume=resume,
+                    **options,
+                )
+        finally:
+            results = Path(results_path).read_bytes() if Path(results_path).exists() else None
+            transactions = pd.read_sql("SELECT * FROM transactions ORDER BY id", engine)
+            run.output = out.getvalue()
+        return results, transactions
+
+    yield run
+    for engine in engines.values():
+        ps.close_storage(engine)
+
+
+def test_resumed_run_matches_an_uninterrupted_run(replay):
+    expected_results, expected_transactions = replay("uninterrupted")
+
+    with pytest.raises(Interrupted):
+        replay("resumed", CrashingOrchestrator(crash_at=CRASH_AT))
+    with ps.use_store(ps.SQLiteStore(ps.db_engine)):
+        checkpoint = ps.load_checkpoint(str(Path(ps.db_engine.url.database).with_suffix(".csv")))
+        assert checkpoint["requests_done"] == (CRASH_AT - 1) // FLUSH_EVERY * FLUSH_EVERY
+        # The interrupted request left a transaction behind the checkpoint
+        assert ps.current_store().last_transaction_id() > checkpoint["last_transaction_id"]
+
+    results, transactions = replay("resumed", resume=True)
+
+    assert "Resuming from checkpoint" in replay.output
+    assert results == expected_results
+    pd.testing.assert_frame_equal(transactions, expected_transactions)
+
+
+def test_completed_or_mismatched_checkpoint_starts_a_fresh_run(replay):
+    expected_results, expected_transactions = replay("fresh")
+
+    # The finished run's checkpoint is marked completed
+    results, transactions = replay("fresh", resume=True)
+    assert "Resuming" not in replay.output
+    assert results == expected_results
+    pd.testing.assert_frame_equal(transactions, expected_transactions)
+
+    # A checkpoint of a run over another requests file doesn't apply either
+    with ps.use_store(ps.SQLiteStore(ps.db_engine)):
+        run_name = str(Path(ps.db_engine.url.database).with_suffix(".csv"))
+        checkpoint = ps.load_checkpoint(run_name)
+        ps.save_checkpoint(run_name, {**checkpoint, "requests_path": "other_requests.csv", "completed": False})
+    results, transactions = replay("fresh", resume=True)
+    assert "Resuming" not in replay.output
+    assert results == expected_results
+    pd.testing.assert_frame_equal(transactions, expected_transactions)
+
+
+def test_run_returns_result_rows_or_the_results_path(replay):
+    replay("rows")
+    rows, summary = replay.returned
+    assert len(rows) == summary["total_requests"]
+    assert rows[0]["request_id"] == 1 and set(rows[0]) == set(ps.RESULT_COLUMNS)
+
+    replay("path", return_path=True)
+    path, _ = replay.returned
+    assert path.endswith("path.csv")
@@ -0,0 +1,121 @@
+"""
+Stock reservations on the SQLite store: optimistic reserving, expiry and commit.
+"""
+import contextlib
+import io
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+import project_starter as ps
+
+ITEM = "A4 paper"
+DATE = "2025-04-01"
+
+
+@pytest.fixture
+def store(tmp_path):
+    engine = ps.create_storage_engine("file", f"sqlite:///{tmp_path / 'reservations.db'}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        ps.init_database(engine)
+    store = ps.SQLiteStore(engine)
+    try:
+        with ps.use_store(store):
+            yield store
+    finally:
+        ps.close_storage(engine)
+
+
+def stock():
+    return int(ps.get_stock_level(ITEM, DATE)["current_stock"].iloc[0])
+
+
+def available():
+    return ps.get_available_stock([ITEM], DATE)[ITEM]
+
+
+def sales_count(store):
+    with store.engine.connect() as conn:
+        return conn.execute(
+            text("SELECT COUNT(*) FROM transactions WHERE item_name = :item AND transaction_type = 'sales'"),
+            {"item": ITEM},
+        ).scalar()
+
+
+def test_racing_reservations_never_exceed_stock(store):
+    on_hand = stock()
+    quantity = on_hand // 5 + 1
+    threads = 8
+    reservations = []
+    barrier = threading.Barrier(threads)
+
+    def reserve():
+        with ps.use_store(store):
+            barrier.wait()
+            reservations.append(ps.reserve_stock(ITEM, quantity, DATE))
+
+    workers = [threading.Thread(target=reserve) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    granted = [reservation for reservation in reservations if reservation is not None]
+    assert len(granted) == on_hand // quantity
+    assert ps.get_reserved_quantities([ITEM])[ITEM] == len(granted) * quantity <= on_hand
+
+
+def test_sale_on_another_connection_fails_a_pending_reservation(store, monkeypatch):
+    on_hand = stock()
+    make_id = ps.uuid.uuid4
+    attempts = []
+
+    def sell_between_check_and_write():
+        # Runs after reserve_stock read the item's version and stock, before it writes
+        attempts.append(True)
+        if len(attempts) == 1:
+            # No session is pinned here, so the sale commits on a connection of its own
+            ps.create_transaction(ITEM, "sales", 1, 0.05, DATE)
+        return make_id()
+
+    monkeypatch.setattr(ps.uuid, "uuid4", sell_between_check_and_write)
+
+    assert ps.reserve_stock(ITEM, on_hand, DATE) is None
+    assert len(attempts) == 1
+    assert ps.get_reserved_quantities([ITEM])[ITEM] == 0
+    assert stock() == on_hand - 1
+
+
+def test_expired_reservation_stops_counting_against_availability(store):
+    on_hand = stock()
+    reservation = ps.reserve_stock(ITEM, 10, DATE, ttl_seconds=0.2)
+    assert reservation is not None
+    assert available() == on_hand - 10
+
+    time.sleep(0.3)
+    assert available() == on_hand
+    assert ps.reserve_stock(ITEM, on_hand, DATE) is not None
+    with pytest.raises(ValueError):
+        ps.commit_reservation(reservation, 1.0)
+
+
+def test_commit_writes_one_sale_and_release_afterwards_does_nothing(store):
+    on_hand = stock()
+    sales = sales_count(store)
+    reservation = ps.reserve_stock(ITEM, 10, DATE)
+    assert ps.get_available_stock([ITEM], DATE, exclude_reservation=reservation)[ITEM] == on_hand
+
+    transaction_id = ps.commit_reservation(reservation, 0.5)
+
+    assert sales_count(store) == sales + 1
+    assert transaction_id == store.last_transaction_id()
+    assert stock() == on_hand - 10
+    assert available() == on_hand - 10
+
+    assert ps.release_reservation(reservation) is False
+    with pytest.raises(ValueError):
+        ps.commit_reservation(reservation, 0.5)
+    assert sales_count(store) == sales + 1
+    assert stock() == on_hand - 10
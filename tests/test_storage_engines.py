@@ -0,0 +1,58 @@
+"""
+Storage backends made by `create_storage_engine`, and the `Store` interface.
+"""
+import threading
+
+import pytest
+from sqlalchemy import text
+
+import project_starter as ps
+
+
+def in_thread(fn, timeout=5):
+    """Run fn on a new thread; return whether it finished within timeout seconds"""
+    thread = threading.Thread(target=fn, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def test_memory_connection_checked_in_from_another_thread_ends_the_turn(tmp_path):
+    engine = ps.create_storage_engine("memory", f"sqlite:///{tmp_path / 'missing.db'}")
+    try:
+        conn = engine.connect()
+        conn.execute(text("SELECT 1"))
+        assert in_thread(conn.close)
+
+        def checkout():
+            with engine.connect() as other:
+                other.execute(text("SELECT 1"))
+
+        assert in_thread(checkout)
+    finally:
+        ps.close_storage(engine)
+
+
+def test_memory_checkouts_nest_on_the_holding_thread(tmp_path):
+    engine = ps.create_storage_engine("memory", f"sqlite:///{tmp_path / 'missing.db'}")
+    try:
+        def nested():
+            with engine.connect() as outer, engine.connect() as inner:
+                outer.execute(text("SELECT 1"))
+                inner.execute(text("SELECT 1"))
+
+        assert in_thread(nested)
+        assert in_thread(nested)
+    finally:
+        ps.close_storage(engine)
+
+
+def test_store_missing_a_method_fails_when_created():
+    class PartialStore(ps.Store):
+        def catalog(self):
+            return {}
+
+    with pytest.raises(TypeError, match="abstract"):
+        PartialStore()
+
+    ps.ArrayStore({})
@@ -0,0 +1,44 @@
+"""
+Units of work on databases written by older versions of `init_database`.
+"""
+import shutil
+from pathlib import Path
+
+from sqlalchemy import text
+
+import project_starter as ps
+
+# The committed database predates the typed 'transactions' schema
+LEGACY_DB = Path(__file__).resolve().parent.parent / "munder_difflin.db"
+
+REQUEST = {
+    "job": "office manager",
+    "need_size": "small",
+    "event": "meeting",
+    "request_text": "I need 200 sheets of A4 paper",
+    "request_date": "2025-04-01",
+    "mood": "neutral",
+}
+
+
+def transactions_id_column(engine):
+    with engine.connect() as conn:
+        columns = conn.execute(text("PRAGMA table_info(transactions)")).fetchall()
+    return next((column for column in columns if column.name == "id"), None)
+
+
+def test_request_on_legacy_database_migrates_before_taking_the_write_lock(tmp_path):
+    path = tmp_path / "legacy.db"
+    shutil.copy(LEGACY_DB, path)
+    engine = ps.create_db_engine(f"sqlite:///{path}")
+    try:
+        legacy_id = transactions_id_column(engine)
+        assert legacy_id is None or legacy_id.pk != 1
+
+        with ps.use_store(ps.SQLiteStore(engine)):
+            response = ps.OrchestratorCore().process_quote_request(REQUEST)
+
+        assert response["status"] == "processed"
+        assert transactions_id_column(engine).pk == 1
+    finally:
+        ps.close_storage(engine)